@@ -1,19 +1,37 @@
+import asyncio
+import gzip
 import os
-from typing import List, Optional, Literal, Dict, Any
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+import re
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Optional, Literal, Dict, Any, Annotated, Mapping, Tuple, Union
+import msgspec
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel, Field
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
-# CORS: allow requests from any domain (no credentials)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=False,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def _install_cors(app: FastAPI) -> None:
+    """CORS: allow requests from any domain (no credentials)"""
+    from fastapi.middleware.cors import CORSMiddleware
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=False,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+_install_cors(app)
+
+# Compresses larger bodies that are not already pre-compressed (see /api/assist)
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
 
 # ----- Models -----
 Subject = Literal[
@@ -25,24 +43,26 @@ Subject = Literal[
     "Computer",
 ]
 
+Need = Literal[
+    "explanation",
+    "steps",
+    "examples",
+    "practice",
+    "summary",
+    "tips",
+    "fun_facts",
+    "related",
+    "visuals",
+    "revision",
+    "quiz"
+]
+
 class AssistRequest(BaseModel):
     student_class: int = Field(..., ge=1, le=10, description="Class/Grade from 1 to 10")
     subject: Subject
     question: str = Field(..., min_length=3)
     language: Optional[str] = Field(default="English", description="Response language hint")
-    needs: Optional[List[Literal[
-        "explanation",
-        "steps",
-        "examples",
-        "practice",
-        "summary",
-        "tips",
-        "fun_facts",
-        "related",
-        "visuals",
-        "revision",
-        "quiz"
-    ]]] = Field(default=None)
+    needs: Optional[List[Need]] = Field(default=None)
 
 class Section(BaseModel):
     title: str
@@ -56,403 +76,696 @@ class AssistResponse(BaseModel):
     safety_note: Optional[str] = None
     follow_up: Optional[str] = None
 
+# Same schema FastAPI documents for its own 422s; /api/assist parses its body
+# by hand, so the route has to list it explicitly
+class ValidationError(BaseModel):
+    loc: List[Union[str, int]] = Field(..., title="Location")
+    msg: str = Field(..., title="Message")
+    type: str = Field(..., title="Error Type")
+
+class HTTPValidationError(BaseModel):
+    detail: List[ValidationError] = Field(default_factory=list)
+
+class AssistBody(msgspec.Struct):
+    """Runtime twin of AssistRequest, decoded and validated in one C pass"""
+    # Kept as the raw JSON value for parse_class, which applies Pydantic's lax
+    # int rules that no msgspec type reproduces
+    student_class: Any
+    subject: Subject
+    question: Annotated[str, msgspec.Meta(min_length=3)]
+    language: Optional[str] = "English"
+    needs: Optional[List[Need]] = None
+
+# The Pydantic models above document the /api/assist contract in OpenAPI; at
+# runtime the body is decoded into AssistBody and the response is plain JSON.
+# Failures are raised as RequestValidationError with the type/loc/msg Pydantic
+# would report, so clients keep getting FastAPI's usual 422 body.
+_ASSIST_DECODER = msgspec.json.Decoder(AssistBody)
+_SUBJECTS = frozenset(Subject.__args__)
+
+def _literal_msg(values: Tuple[str, ...]) -> str:
+    quoted = [repr(value) for value in values]
+    return "Input should be " + ", ".join(quoted[:-1]) + " or " + quoted[-1]
+
+_SUBJECT_MSG = _literal_msg(Subject.__args__)
+_NEED_MSG = _literal_msg(Need.__args__)
+_OBJECT_MSG = "Input should be a valid dictionary or object to extract fields from"
+_INT_MSGS = {
+    "int_type": "Input should be a valid integer",
+    "int_parsing": "Input should be a valid integer, unable to parse string as an integer",
+    "int_from_float": "Input should be a valid integer, got a number with a fractional part",
+    "int_parsing_size": "Unable to parse input string as an integer, exceeded maximum size",
+}
+# Strings Pydantic's lax int accepts: optional sign, digits (underscores
+# allowed) and an optional all-zero fraction such as "5.0"
+_INT_STR = re.compile(r"([+-]?\d+(?:_\d+)*)(?:\.0*)?")
+
+# msgspec stops at the first problem and reports it as "<message> - at
+# `$.field[index]`"; the path becomes the loc and the field picks the
+# Pydantic error. Only needs has indexed items.
+_MSGSPEC_PATH = re.compile(r".* - at `\$\.(\w+)(?:\[(\d+)\])?`", re.S)
+_MSGSPEC_MISSING = re.compile(r"Object missing required field `(\w+)`")
+_MSGSPEC_BYTE = re.compile(r"\(byte (\d+)\)$")
+_FIELD_ERRORS = {
+    "student_class": ("finite_number", "Input should be a finite number"),
+    "subject": ("literal_error", _SUBJECT_MSG),
+    "question": ("string_type", "Input should be a valid string"),
+    "language": ("string_type", "Input should be a valid string"),
+    "needs": ("list_type", "Input should be a valid list"),
+}
+
+def body_error(kind: str, loc: Tuple[Union[str, int], ...], msg: str) -> Dict[str, Any]:
+    return {"type": kind, "loc": ("body",) + loc, "msg": msg}
+
+def is_json_content(content_type: Optional[str]) -> bool:
+    """FastAPI's rule for parsing a body as JSON: no content type at all,
+    application/json or application/*+json"""
+    if not content_type:
+        return True
+    media = content_type.partition(";")[0].strip().lower()
+    return media == "application/json" or (media.startswith("application/") and media.endswith("+json"))
+
+def parse_class(value: Any, errors: List[Dict[str, Any]]) -> int:
+    """student_class coerced like Pydantic's lax int: booleans, integral floats
+    and integer strings pass. Problems are appended to errors."""
+    if isinstance(value, int):  # bool included, true reads as 1
+        level = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        level = int(value)
+    elif isinstance(value, str) and _INT_STR.fullmatch(value.strip()):
+        try:
+            level = int(_INT_STR.fullmatch(value.strip()).group(1))
+        except ValueError:  # more digits than int() will parse
+            errors.append(body_error("int_parsing_size", ("student_class",), _INT_MSGS["int_parsing_size"]))
+            return 0
+    else:
+        kind = "int_from_float" if isinstance(value, float) else "int_parsing" if isinstance(value, str) else "int_type"
+        errors.append(body_error(kind, ("student_class",), _INT_MSGS[kind]))
+        return 0
+    if level < 1:
+        errors.append(body_error("greater_than_equal", ("student_class",), "Input should be greater than or equal to 1"))
+    elif level > 10:
+        errors.append(body_error("less_than_equal", ("student_class",), "Input should be less than or equal to 10"))
+    return level
+
+def msgspec_error(exc: msgspec.ValidationError) -> Dict[str, Any]:
+    """msgspec's validation error as the error Pydantic reports for it"""
+    message = str(exc)
+    missing = _MSGSPEC_MISSING.fullmatch(message)
+    if missing:
+        return body_error("missing", (missing.group(1),), "Field required")
+    path = _MSGSPEC_PATH.fullmatch(message)
+    if path is None:
+        # The body itself is not an object; null counts as no body at all
+        if message.endswith("got `null`"):
+            return body_error("missing", (), "Field required")
+        return body_error("model_attributes_type", (), _OBJECT_MSG)
+    field, index = path.groups()
+    if index is not None:
+        return body_error("literal_error", (field, int(index)), _NEED_MSG)
+    if field == "question" and "length" in message:
+        return body_error("string_too_short", (field,), "String should have at least 3 characters")
+    kind, msg = _FIELD_ERRORS[field]
+    return body_error(kind, (field,), msg)
+
+async def decode_assist_body(request: Request) -> AssistBody:
+    """The body decoded like FastAPI would for an AssistRequest parameter:
+    empty means missing, and only JSON content types are parsed"""
+    body = await request.body()
+    if not body:
+        raise RequestValidationError([body_error("missing", (), "Field required")])
+    if not is_json_content(request.headers.get("content-type")):
+        raise RequestValidationError([body_error("model_attributes_type", (), _OBJECT_MSG)])
+    try:
+        return _ASSIST_DECODER.decode(body)
+    except msgspec.ValidationError as exc:
+        raise RequestValidationError([msgspec_error(exc)])
+    except msgspec.DecodeError as exc:
+        position = _MSGSPEC_BYTE.search(str(exc))
+        raise RequestValidationError([{
+            "type": "json_invalid",
+            "loc": ("body", int(position.group(1)) if position else len(body)),
+            "msg": "JSON decode error",
+            "ctx": {"error": str(exc)},
+        }])
+
 # ----- Utility: Simple safety and clarity checks -----
 HARMFUL_KEYWORDS = {
     "self-harm", "suicide", "violence", "bomb", "weapon", "drugs", "extremism"
 }
 
-def is_harmful(text: str) -> bool:
-    t = text.lower()
-    return any(k in t for k in HARMFUL_KEYWORDS)
-
-# Age-adjusted helpers
+# One alternation scanned in C instead of a Python-level pass per keyword
+_HARMFUL_RE = re.compile("|".join(map(re.escape, sorted(HARMFUL_KEYWORDS))))
 
-def level_tone(level: int) -> Dict[str, Any]:
-    if level <= 2:
-        return {
-            "voice": "very simple, friendly",
-            "sent_len": 8,
-            "bullets": True
-        }
-    if level <= 5:
-        return {
-            "voice": "simple and clear",
-            "sent_len": 12,
-            "bullets": True
-        }
-    if level <= 8:
-        return {
-            "voice": "clear with a bit more detail",
-            "sent_len": 16,
-            "bullets": True
-        }
-    return {
-        "voice": "concise, structured, and exam-oriented",
-        "sent_len": 18,
-        "bullets": True
-    }
+def is_harmful_lower(q_lower: str) -> bool:
+    return _HARMFUL_RE.search(q_lower) is not None
 
-# Content generators (rule-based, no external calls)
+# Age-adjusted helpers
 
-def explain_math(level: int, question: str) -> Dict[str, List[str]]:
-    q = question.strip()
-    steps = []
-    examples = []
-    tips = []
-    practice = []
+_TONE_EARLY = MappingProxyType({
+    "voice": "very simple, friendly",
+    "sent_len": 8,
+    "bullets": True
+})
+_TONE_PRIMARY = MappingProxyType({
+    "voice": "simple and clear",
+    "sent_len": 12,
+    "bullets": True
+})
+_TONE_MIDDLE = MappingProxyType({
+    "voice": "clear with a bit more detail",
+    "sent_len": 16,
+    "bullets": True
+})
+_TONE_SECONDARY = MappingProxyType({
+    "voice": "concise, structured, and exam-oriented",
+    "sent_len": 18,
+    "bullets": True
+})
+
+# Indexed by class level; index 0 is unused
+_TONES = (
+    None,
+    _TONE_EARLY, _TONE_EARLY,
+    _TONE_PRIMARY, _TONE_PRIMARY, _TONE_PRIMARY,
+    _TONE_MIDDLE, _TONE_MIDDLE, _TONE_MIDDLE,
+    _TONE_SECONDARY, _TONE_SECONDARY,
+)
+_INTRO_TAIL = tuple(tone and "I'll keep it " + tone["voice"] + "." for tone in _TONES)
+_INTRO_LAST = "You'll get steps, examples, practice, visuals, a short quiz, and revision notes."
+
+# Topic classifiers: all keywords of a subject are compiled into one pattern
+# with a named group per topic, so the question is scanned once. Each group
+# sits in a lookahead, which makes every position report its highest-priority
+# topic without consuming text that a higher-priority keyword might overlap.
+TopicMatcher = Tuple["re.Pattern[str]", Tuple[str, ...]]
+
+def compile_topics(topics: Dict[str, List[str]]) -> TopicMatcher:
+    alternatives = "|".join(
+        "(?P<%s>%s)" % (topic, "|".join(map(re.escape, keywords)))
+        for topic, keywords in topics.items()
+    )
+    return re.compile("(?=%s)" % alternatives), tuple(topics)
+
+def classify(matcher: TopicMatcher, q_lower: str) -> str:
+    pattern, names = matcher
+    best = len(names) + 1
+    for match in pattern.finditer(q_lower):
+        # Groups are numbered in priority order
+        if match.lastindex < best:
+            best = match.lastindex
+            if best == 1:
+                break
+    return names[best - 1] if best <= len(names) else "default"
+
+_MATH_TOPICS = compile_topics({
+    "add": ["add", "sum", "+", "plus"],
+    "sub": ["subtrac", "-", "minus", "difference"],
+    "frac": ["fraction", "/", "numerator", "denominator"],
+    "alg": ["algebra", "solve", "equation", "x=", "find x"],
+})
+_SCIENCE_TOPICS = compile_topics({"photosynthesis": ["photosynthesis"]})
+_ENGLISH_TOPICS = compile_topics({"grammar": ["noun", "verb", "adjective", "adverb"]})
+_SOCIAL_TOPICS = compile_topics({"civics": ["democracy", "government"]})
+_COMPUTER_TOPICS = compile_topics({"algorithm": ["algorithm", "flowchart"]})
+
+# Content templates (rule-based, no external calls). Every value is a tuple and
+# every template a read-only mapping, so explainers return them by reference.
+Content = Mapping[str, Tuple[str, ...]]
+
+_MATH_SHARED = {
+    "summary": ("Solve carefully, show steps, and double-check.",),
+    "fun_facts": ("Zero is the only number that is neither positive nor negative.",),
+    "related": ("Place value", "Word problems", "Estimation"),
+    "visuals": (
+        "Picture: Number line showing jumps for addition/subtraction.",
+        "Diagram: Balance scale to show equation solving."
+    ),
+    "revision": (
+        "Revise place value and basic operations.",
+        "Memorize common fraction equivalents (1/2=0.5, 1/4=0.25)."
+    ),
+    "quiz": (
+        "Quick Quiz: 12 + 19 = ?",
+        "True/False: To divide fractions, flip the second and multiply.",
+    ),
+}
 
-    # Very lightweight heuristics
-    if any(k in q.lower() for k in ["add", "sum", "+", "plus"]):
-        steps = [
+_MATH_TEMPLATES: Dict[str, Content] = {
+    "add": MappingProxyType({
+        "steps": (
             "Line up the numbers by place value.",
             "Add digits from right to left.",
             "If a sum is 10 or more, carry to the next place.",
             "Write the final answer neatly."
-        ]
-        examples = ["23 + 19 = 42", "305 + 70 = 375"]
-        practice = ["47 + 28 = ?", "506 + 289 = ?"]
-        tips = ["Check by reversing the addends.", "Estimate first to see if your answer is reasonable."]
-    elif any(k in q.lower() for k in ["subtrac", "-", "minus", "difference"]):
-        steps = [
+        ),
+        "examples": ("23 + 19 = 42", "305 + 70 = 375"),
+        "practice": ("47 + 28 = ?", "506 + 289 = ?"),
+        "tips": ("Check by reversing the addends.", "Estimate first to see if your answer is reasonable."),
+        **_MATH_SHARED,
+    }),
+    "sub": MappingProxyType({
+        "steps": (
             "Line up the numbers by place value.",
             "Subtract from right to left.",
             "If the top digit is smaller, borrow from the next left place.",
             "Write the difference."
-        ]
-        examples = ["54 - 27 = 27", "700 - 256 = 444"]
-        practice = ["63 - 38 = ?", "900 - 457 = ?"]
-        tips = ["Add the answer to the smaller number to check."]
-    elif any(k in q.lower() for k in ["fraction", "/", "numerator", "denominator"]):
-        steps = [
+        ),
+        "examples": ("54 - 27 = 27", "700 - 256 = 444"),
+        "practice": ("63 - 38 = ?", "900 - 457 = ?"),
+        "tips": ("Add the answer to the smaller number to check.",),
+        **_MATH_SHARED,
+    }),
+    "frac": MappingProxyType({
+        "steps": (
             "Make denominators the same if you add or subtract.",
             "Multiply across for multiplication.",
             "Flip the second fraction and multiply for division.",
             "Simplify by dividing numerator and denominator by the same number."
-        ]
-        examples = ["1/2 + 1/3 = 5/6", "3/4 × 2/3 = 1/2"]
-        practice = ["2/5 + 1/10 = ?", "5/6 ÷ 2/3 = ?"]
-        tips = ["Always simplify your final fraction."]
-    elif any(k in q.lower() for k in ["algebra", "solve", "equation", "x=", "find x"]):
-        steps = [
+        ),
+        "examples": ("1/2 + 1/3 = 5/6", "3/4 × 2/3 = 1/2"),
+        "practice": ("2/5 + 1/10 = ?", "5/6 ÷ 2/3 = ?"),
+        "tips": ("Always simplify your final fraction.",),
+        **_MATH_SHARED,
+    }),
+    "alg": MappingProxyType({
+        "steps": (
             "Keep the equation balanced: do the same to both sides.",
             "Move constants to one side and variables to the other.",
             "Combine like terms.",
             "Isolate the variable to find its value."
-        ]
-        examples = ["2x + 5 = 13 → 2x = 8 → x = 4", "3(x-2) = 9 → x-2 = 3 → x = 5"]
-        practice = ["5x - 7 = 18", "4(x + 3) = 28"]
-        tips = ["Check by substituting your value back into the equation."]
-    else:
-        steps = [
+        ),
+        "examples": ("2x + 5 = 13 → 2x = 8 → x = 4", "3(x-2) = 9 → x-2 = 3 → x = 5"),
+        "practice": ("5x - 7 = 18", "4(x + 3) = 28"),
+        "tips": ("Check by substituting your value back into the equation.",),
+        **_MATH_SHARED,
+    }),
+    "default": MappingProxyType({
+        "steps": (
             "Identify what is being asked.",
             "Write down the known information.",
             "Choose a suitable method or formula.",
             "Solve step by step and check your answer."
-        ]
-        examples = ["Area of rectangle: A = l × w", "Mean = sum of data ÷ number of items"]
-        practice = ["Find the perimeter of a 6 cm by 9 cm rectangle.", "Calculate the mean of 5, 7, 3, 10."]
-        tips = ["Underline key numbers and units."]
+        ),
+        "examples": ("Area of rectangle: A = l × w", "Mean = sum of data ÷ number of items"),
+        "practice": ("Find the perimeter of a 6 cm by 9 cm rectangle.", "Calculate the mean of 5, 7, 3, 10."),
+        "tips": ("Underline key numbers and units.",),
+        **_MATH_SHARED,
+    }),
+}
 
-    summary = ["Solve carefully, show steps, and double-check."]
-    fun = ["Zero is the only number that is neither positive nor negative."]
-    related = ["Place value", "Word problems", "Estimation"]
+_SCIENCE_SHARED = {
+    "visuals": (
+        "Diagram: Sun → Leaf → Sugar + Oxygen arrows.",
+        "Chart: Variables vs outcomes in an experiment."
+    ),
+    "revision": (
+        "Recall: solid, liquid, gas changes.",
+        "Know the steps of the scientific method."
+    ),
+    "quiz": (
+        "MCQ: Plants take in (a) oxygen (b) carbon dioxide during photosynthesis.",
+        "Fill in the blank: Energy for photosynthesis comes from _____."
+    ),
+}
 
-    visuals = [
-        "Picture: Number line showing jumps for addition/subtraction.",
-        "Diagram: Balance scale to show equation solving."
-    ]
-    revision = [
-        "Revise place value and basic operations.",
-        "Memorize common fraction equivalents (1/2=0.5, 1/4=0.25)."
-    ]
-    quiz = [
-        "Quick Quiz: 12 + 19 = ?",
-        "True/False: To divide fractions, flip the second and multiply.",
-    ]
+_SCIENCE_TEMPLATES: Dict[str, Content] = {
+    "photosynthesis": MappingProxyType({
+        "steps": (
+            "Plants take in sunlight with chlorophyll in leaves.",
+            "They use water from roots and carbon dioxide from air.",
+            "They make glucose (food) and release oxygen."
+        ),
+        "examples": ("Leaf in sunlight makes more oxygen than in shade.",),
+        "practice": ("Name two things plants need for photosynthesis.", "Why is sunlight important?"),
+        "tips": ("Remember: Sun + CO2 + Water → Glucose + Oxygen",),
+        "summary": ("Photosynthesis is how plants make food using sunlight.",),
+        "fun_facts": ("Chloroplasts are the tiny food factories in plant cells.",),
+        "related": ("Food chains", "Respiration", "Plant cells"),
+        **_SCIENCE_SHARED,
+    }),
+    "default": MappingProxyType({
+        "steps": ("Observe, ask a question, make a hypothesis, test, and conclude.",),
+        "examples": ("Testing which paper towel absorbs more water.",),
+        "practice": ("Write a simple hypothesis about melting ice.",),
+        "tips": ("Change only one variable at a time.",),
+        "summary": ("Science uses fair tests to learn about the world.",),
+        "fun_facts": ("Honey never spoils because it has very little water.",),
+        "related": ("Variables", "Fair test", "Data tables"),
+        **_SCIENCE_SHARED,
+    }),
+}
 
-    return {
-        "steps": steps,
-        "examples": examples,
-        "practice": practice,
-        "tips": tips,
-        "summary": summary,
-        "fun_facts": fun,
-        "related": related,
-        "visuals": visuals,
-        "revision": revision,
-        "quiz": quiz,
-    }
+_ENGLISH_SHARED = {
+    "visuals": (
+        "Mind map: Topic in center with branches for main idea and details.",
+        "Color-coded sentence showing noun/verb/adjective/adverb."
+    ),
+    "revision": (
+        "Revise punctuation basics: . , ? !",
+        "Know the difference between there/they're/their."
+    ),
+    "quiz": (
+        "Identify the adjective: The small puppy barked loudly.",
+        "Choose a transition to add: First/Then/Finally."
+    ),
+}
 
+_ENGLISH_TEMPLATES: Dict[str, Content] = {
+    "grammar": MappingProxyType({
+        "steps": ("Find the word's job in the sentence.",),
+        "examples": ("Noun: dog; Verb: runs; Adjective: happy; Adverb: quickly.",),
+        "practice": ("Underline the verbs in: The cat quietly slept.",),
+        "tips": ("Adjectives describe nouns; adverbs describe verbs/adjectives.",),
+        "summary": ("Parts of speech tell how words work.",),
+        "fun_facts": ("English borrows words from many languages!",),
+        "related": ("Sentence types", "Punctuation"),
+        **_ENGLISH_SHARED,
+    }),
+    "default": MappingProxyType({
+        "steps": ("Read closely, find main idea, then details.",),
+        "examples": ("Main idea: what the text is mostly about.",),
+        "practice": ("Write a 2-sentence summary of a short paragraph.",),
+        "tips": ("Use transition words: first, then, finally.",),
+        "summary": ("Clarity and structure make writing strong.",),
+        "fun_facts": ("There are more than a million English words.",),
+        "related": ("Synonyms", "Paragraphs", "Summaries"),
+        **_ENGLISH_SHARED,
+    }),
+}
 
-def explain_science(level: int, question: str) -> Dict[str, List[str]]:
-    q = question.lower()
-    if "photosynthesis" in q:
-        base = {
-            "steps": [
-                "Plants take in sunlight with chlorophyll in leaves.",
-                "They use water from roots and carbon dioxide from air.",
-                "They make glucose (food) and release oxygen."
-            ],
-            "examples": ["Leaf in sunlight makes more oxygen than in shade."],
-            "practice": ["Name two things plants need for photosynthesis.", "Why is sunlight important?"],
-            "tips": ["Remember: Sun + CO2 + Water → Glucose + Oxygen"],
-            "summary": ["Photosynthesis is how plants make food using sunlight."],
-            "fun_facts": ["Chloroplasts are the tiny food factories in plant cells."],
-            "related": ["Food chains", "Respiration", "Plant cells"],
-        }
-    else:
-        base = {
-            "steps": ["Observe, ask a question, make a hypothesis, test, and conclude."],
-            "examples": ["Testing which paper towel absorbs more water."],
-            "practice": ["Write a simple hypothesis about melting ice."],
-            "tips": ["Change only one variable at a time."],
-            "summary": ["Science uses fair tests to learn about the world."],
-            "fun_facts": ["Honey never spoils because it has very little water."],
-            "related": ["Variables", "Fair test", "Data tables"],
-        }
-
-    base.update({
-        "visuals": [
-            "Diagram: Sun → Leaf → Sugar + Oxygen arrows.",
-            "Chart: Variables vs outcomes in an experiment."
-        ],
-        "revision": [
-            "Recall: solid, liquid, gas changes.",
-            "Know the steps of the scientific method."
-        ],
-        "quiz": [
-            "MCQ: Plants take in (a) oxygen (b) carbon dioxide during photosynthesis.",
-            "Fill in the blank: Energy for photosynthesis comes from _____."
-        ]
-    })
-    return base
-
-
-def explain_english(level: int, question: str) -> Dict[str, List[str]]:
-    q = question.lower()
-    if any(k in q for k in ["noun", "verb", "adjective", "adverb"]):
-        base = {
-            "steps": ["Find the word's job in the sentence."],
-            "examples": ["Noun: dog; Verb: runs; Adjective: happy; Adverb: quickly."],
-            "practice": ["Underline the verbs in: The cat quietly slept."],
-            "tips": ["Adjectives describe nouns; adverbs describe verbs/adjectives."],
-            "summary": ["Parts of speech tell how words work."],
-            "fun_facts": ["English borrows words from many languages!"],
-            "related": ["Sentence types", "Punctuation"],
-        }
-    else:
-        base = {
-            "steps": ["Read closely, find main idea, then details."],
-            "examples": ["Main idea: what the text is mostly about."],
-            "practice": ["Write a 2-sentence summary of a short paragraph."],
-            "tips": ["Use transition words: first, then, finally."],
-            "summary": ["Clarity and structure make writing strong."],
-            "fun_facts": ["There are more than a million English words."],
-            "related": ["Synonyms", "Paragraphs", "Summaries"],
-        }
-
-    base.update({
-        "visuals": [
-            "Mind map: Topic in center with branches for main idea and details.",
-            "Color-coded sentence showing noun/verb/adjective/adverb."
-        ],
-        "revision": [
-            "Revise punctuation basics: . , ? !",
-            "Know the difference between there/they're/their."
-        ],
-        "quiz": [
-            "Identify the adjective: The small puppy barked loudly.",
-            "Choose a transition to add: First/Then/Finally."
-        ]
-    })
-    return base
-
-
-def explain_social(level: int, question: str) -> Dict[str, List[str]]:
-    q = question.lower()
-    if any(k in q for k in ["democracy", "government"]):
-        base = {
-            "steps": ["People choose leaders, leaders make and enforce rules."],
-            "examples": ["Voting in local elections."],
-            "practice": ["Name two features of a democracy."],
-            "tips": ["Remember: rights and responsibilities go together."],
-            "summary": ["Democracy means rule by the people."],
-            "fun_facts": ["Ancient Athens had an early form of democracy."],
-            "related": ["Constitution", "Citizenship"],
-        }
+_SOCIAL_SHARED = {
+    "visuals": (
+        "Timeline sketch with dates and short notes.",
+        "Map outline highlighting key regions."
+    ),
+    "revision": (
+        "Remember key terms: democracy, constitution, citizen.",
+        "Practice reading maps and legends."
+    ),
+    "quiz": (
+        "Short answer: What is one feature of a democracy?",
+        "Match: Event → Year (from your chapter)."
+    ),
+}
+
+_SOCIAL_TEMPLATES: Dict[str, Content] = {
+    "civics": MappingProxyType({
+        "steps": ("People choose leaders, leaders make and enforce rules.",),
+        "examples": ("Voting in local elections.",),
+        "practice": ("Name two features of a democracy.",),
+        "tips": ("Remember: rights and responsibilities go together.",),
+        "summary": ("Democracy means rule by the people.",),
+        "fun_facts": ("Ancient Athens had an early form of democracy.",),
+        "related": ("Constitution", "Citizenship"),
+        **_SOCIAL_SHARED,
+    }),
+    "default": MappingProxyType({
+        "steps": ("Identify time, place, people, and causes/effects.",),
+        "examples": ("Cause and effect in historical events.",),
+        "practice": ("Make a timeline of three key events from a chapter.",),
+        "tips": ("Use maps and dates to organize information.",),
+        "summary": ("Social studies connects people, places, and time.",),
+        "fun_facts": ("The Silk Road was a network, not one road.",),
+        "related": ("Timelines", "Maps", "Civics"),
+        **_SOCIAL_SHARED,
+    }),
+}
+
+_LANGUAGES_CONTENT: Content = MappingProxyType({
+    "steps": ("Learn basic greetings, numbers, and simple grammar.",),
+    "examples": ("Hola (Hello) in Spanish; Namaste in Hindi.",),
+    "practice": ("Translate five classroom objects into the target language.",),
+    "tips": ("Practice a little every day and speak out loud.",),
+    "summary": ("Start small and build vocabulary steadily.",),
+    "fun_facts": ("Many languages share common roots called cognates.",),
+    "related": ("Pronunciation", "Vocabulary", "Grammar"),
+    "visuals": ("Flashcards with picture on one side and word on the other.",),
+    "revision": ("Revise 10 core words daily and one grammar rule.",),
+    "quiz": ("Say or write 3 greetings and 3 numbers in the language.",),
+})
+
+_COMPUTER_SHARED = {
+    "visuals": ("Block diagram: Input → CPU → Output, with Storage connected.",),
+    "revision": ("Revise basic parts: CPU, memory, storage, input/output devices.",),
+    "quiz": ("MCQ: CPU stands for _____.", "Name one input and one output device."),
+}
+
+_COMPUTER_TEMPLATES: Dict[str, Content] = {
+    "algorithm": MappingProxyType({
+        "steps": (
+            "Define the problem clearly.",
+            "List steps in order (algorithm).",
+            "Draw a flowchart with start/end, input/output, and process boxes.",
+            "Test the steps with a simple example."
+        ),
+        "examples": (
+            "Algorithm: Make tea → Boil water → Add tea → Pour → Add milk/sugar.",
+            "Flowchart: Start → Read two numbers → Add → Show sum → End"
+        ),
+        "practice": ("Write an algorithm for brushing teeth.", "Draw a flowchart for adding two numbers."),
+        "tips": ("Use clear, short steps; one action per step.",),
+        "summary": ("Algorithms are ordered steps; flowcharts show them visually.",),
+        "fun_facts": ("The word 'algorithm' comes from Al-Khwarizmi, a Persian scholar.",),
+        "related": ("Pseudocode", "Debugging", "Programming basics"),
+        **_COMPUTER_SHARED,
+    }),
+    "default": MappingProxyType({
+        "steps": ("Input → Process → Output → Storage (IPO cycle).",),
+        "examples": ("Typing (input), Word processor (process), Printed page (output).",),
+        "practice": ("List 2 input and 2 output devices.",),
+        "tips": ("Keep files organized with clear names and folders.",),
+        "summary": ("Computers take input, process it, and give output; they can store data.",),
+        "fun_facts": ("Early computers filled whole rooms!",),
+        "related": ("Hardware", "Software", "Networks"),
+        **_COMPUTER_SHARED,
+    }),
+}
+
+# Per subject: its topic matcher (None when there is a single template) and
+# the template for each topic id it returns, plus "default". Skeletons below
+# are keyed by (subject, topic id).
+_SUBJECT_TOPICS: Dict[str, Tuple[Optional[TopicMatcher], Dict[str, Content]]] = {
+    "Math": (_MATH_TOPICS, _MATH_TEMPLATES),
+    "Science": (_SCIENCE_TOPICS, _SCIENCE_TEMPLATES),
+    "English": (_ENGLISH_TOPICS, _ENGLISH_TEMPLATES),
+    "Social Studies": (_SOCIAL_TOPICS, _SOCIAL_TEMPLATES),
+    "Languages": (None, {"default": _LANGUAGES_CONTENT}),
+    "Computer": (_COMPUTER_TOPICS, _COMPUTER_TEMPLATES),
+}
+
+def classify_question(subject: Subject, q_lower: str) -> str:
+    """Topic id of the subject template that answers the question"""
+    matcher = _SUBJECT_TOPICS[subject][0]
+    return "default" if matcher is None else classify(matcher, q_lower)
+
+# Memos below only take questions up to this length, so they stay bounded in
+# bytes as well as entries; longer ones are computed directly.
+_CACHEABLE_TOPIC_LEN = 200
+
+# Classification memo; also serves repeats that miss the response memo
+# because they differ only in level, casing, surrounding whitespace or needs.
+_cached_topic_id = lru_cache(maxsize=4096)(classify_question)
+
+# ----- Response building -----
+# (need, section title) in response order; every content template carries all
+# keys after "explanation", which is built per request
+SECTIONS = (
+    ("explanation", "Explanation"),
+    ("steps", "Step-by-step"),
+    ("examples", "Examples"),
+    ("practice", "Practice Questions"),
+    ("summary", "Quick Summary"),
+    ("tips", "Helpful Tips"),
+    ("fun_facts", "Fun Facts"),
+    ("related", "Related Topics"),
+    ("visuals", "Visual Description"),
+    ("revision", "Revision Notes"),
+    ("quiz", "Interactive Quiz"),
+)
+
+# Requested sections travel as a bitmask over SECTIONS: an int is cheaper to
+# build and hash than a frozenset, and is what the response memo is keyed by.
+_NEED_BITS = {need: 1 << i for i, (need, _) in enumerate(SECTIONS)}
+ALL_NEEDS = (1 << len(SECTIONS)) - 1
+
+def needs_mask(needs: Optional[List[str]]) -> int:
+    """Bitmask of the requested sections; missing or empty means all of them"""
+    if not needs:
+        return ALL_NEEDS
+    mask = 0
+    for need in needs:
+        mask |= _NEED_BITS[need]
+    return mask
+
+FOLLOW_UP = "If this isn't quite your topic, tell me your class (1-10) and the exact chapter or exercise number."
+
+# Byte skeletons for the default (all sections) response. Only the level and
+# the topic vary per request; everything else is serialized once here.
+def _full_sections_tail(content: Content) -> bytes:
+    sections = b"".join(
+        b"," + orjson.dumps({"title": title, "content": content[key]})
+        for key, title in SECTIONS[1:]
+    )
+    return sections + b'],"safety_note":null,"follow_up":' + orjson.dumps(FOLLOW_UP) + b"}"
+
+_SUBJECT_JSON = {subject: b',"subject":' + orjson.dumps(subject) + b',"topic":' for subject in _SUBJECTS}
+_INTRO_TAIL_JSON = tuple(
+    tail and b"," + orjson.dumps(tail) + b"," + orjson.dumps(_INTRO_LAST) + b"]}"
+    for tail in _INTRO_TAIL
+)
+_FULL_TAIL_JSON = {
+    (subject, topic_id): _full_sections_tail(content)
+    for subject, (_, templates) in _SUBJECT_TOPICS.items()
+    for topic_id, content in templates.items()
+}
+
+def build_full_payload(level: int, subject: Subject, topic: str, topic_id: str) -> bytes:
+    return b"".join((
+        b'{"level":%d' % level,
+        _SUBJECT_JSON[subject],
+        orjson.dumps(topic),
+        b',"sections":[{"title":"Explanation","content":[',
+        orjson.dumps("Let's learn about: " + topic + "."),
+        _INTRO_TAIL_JSON[level],
+        _FULL_TAIL_JSON[subject, topic_id],
+    ))
+
+def build_assist_payload(level: int, subject: Subject, topic: str, needs: int) -> bytes:
+    """Serialized /api/assist body; deterministic in its arguments"""
+    # The topic id picks both the skeleton and the content template
+    q_lower = topic.lower()
+    if len(q_lower) <= _CACHEABLE_TOPIC_LEN:
+        topic_id = _cached_topic_id(subject, q_lower)
     else:
-        base = {
-            "steps": ["Identify time, place, people, and causes/effects."],
-            "examples": ["Cause and effect in historical events."],
-            "practice": ["Make a timeline of three key events from a chapter."],
-            "tips": ["Use maps and dates to organize information."],
-            "summary": ["Social studies connects people, places, and time."],
-            "fun_facts": ["The Silk Road was a network, not one road."],
-            "related": ["Timelines", "Maps", "Civics"],
-        }
-
-    base.update({
-        "visuals": [
-            "Timeline sketch with dates and short notes.",
-            "Map outline highlighting key regions."
-        ],
-        "revision": [
-            "Remember key terms: democracy, constitution, citizen.",
-            "Practice reading maps and legends."
-        ],
-        "quiz": [
-            "Short answer: What is one feature of a democracy?",
-            "Match: Event → Year (from your chapter)."
-        ]
-    })
-    return base
-
-
-def explain_languages(level: int, question: str) -> Dict[str, List[str]]:
-    base = {
-        "steps": ["Learn basic greetings, numbers, and simple grammar."],
-        "examples": ["Hola (Hello) in Spanish; Namaste in Hindi."],
-        "practice": ["Translate five classroom objects into the target language."],
-        "tips": ["Practice a little every day and speak out loud."],
-        "summary": ["Start small and build vocabulary steadily."],
-        "fun_facts": ["Many languages share common roots called cognates."],
-        "related": ["Pronunciation", "Vocabulary", "Grammar"],
-    }
-    base.update({
-        "visuals": ["Flashcards with picture on one side and word on the other."],
-        "revision": ["Revise 10 core words daily and one grammar rule."],
-        "quiz": ["Say or write 3 greetings and 3 numbers in the language."]
+        topic_id = classify_question(subject, q_lower)
+    if needs == ALL_NEEDS:
+        return build_full_payload(level, subject, topic, topic_id)
+    content = _SUBJECT_TOPICS[subject][1][topic_id]
+
+    # Only the requested sections, in the standard order
+    intro = ("Let's learn about: " + topic + ".", _INTRO_TAIL[level], _INTRO_LAST)
+    sections = [
+        {"title": title, "content": intro if key == "explanation" else content[key]}
+        for i, (key, title) in enumerate(SECTIONS)
+        if needs >> i & 1
+    ]
+
+    return orjson.dumps({
+        "level": level,
+        "subject": subject,
+        "topic": topic,
+        "sections": sections,
+        "safety_note": None,
+        "follow_up": FOLLOW_UP,
     })
-    return base
-
-
-def explain_computer(level: int, question: str) -> Dict[str, List[str]]:
-    q = question.lower()
-    if any(k in q for k in ["algorithm", "flowchart"]):
-        base = {
-            "steps": [
-                "Define the problem clearly.",
-                "List steps in order (algorithm).",
-                "Draw a flowchart with start/end, input/output, and process boxes.",
-                "Test the steps with a simple example."
-            ],
-            "examples": [
-                "Algorithm: Make tea → Boil water → Add tea → Pour → Add milk/sugar.",
-                "Flowchart: Start → Read two numbers → Add → Show sum → End"
-            ],
-            "practice": ["Write an algorithm for brushing teeth.", "Draw a flowchart for adding two numbers."],
-            "tips": ["Use clear, short steps; one action per step."],
-            "summary": ["Algorithms are ordered steps; flowcharts show them visually."],
-            "fun_facts": ["The word 'algorithm' comes from Al-Khwarizmi, a Persian scholar."],
-            "related": ["Pseudocode", "Debugging", "Programming basics"],
-        }
-    else:
-        base = {
-            "steps": ["Input → Process → Output → Storage (IPO cycle)."],
-            "examples": ["Typing (input), Word processor (process), Printed page (output)."],
-            "practice": ["List 2 input and 2 output devices."],
-            "tips": ["Keep files organized with clear names and folders."],
-            "summary": ["Computers take input, process it, and give output; they can store data."],
-            "fun_facts": ["Early computers filled whole rooms!"],
-            "related": ["Hardware", "Software", "Networks"],
-        }
-    base.update({
-        "visuals": ["Block diagram: Input → CPU → Output, with Storage connected."],
-        "revision": ["Revise basic parts: CPU, memory, storage, input/output devices."],
-        "quiz": ["MCQ: CPU stands for _____.", "Name one input and one output device."]
+
+# The safety guard reply only varies by level and subject, so every variant
+# is serialized up front
+_SAFETY_BODIES = {
+    (level, subject): orjson.dumps({
+        "level": level,
+        "subject": subject,
+        "topic": "Safety Guard",
+        "sections": [{"title": "Notice", "content": [
+            "I can't help with harmful or inappropriate content.",
+            "Please ask about your school subjects like Math, Science, English, Social Studies, Languages, or Computer."
+        ]}],
+        "safety_note": "Content filtered for safety.",
+        "follow_up": None,
     })
-    return base
-
-
-def generate_content(level: int, subject: Subject, question: str) -> Dict[str, List[str]]:
-    if subject == "Math":
-        return explain_math(level, question)
-    if subject == "Science":
-        return explain_science(level, question)
-    if subject == "English":
-        return explain_english(level, question)
-    if subject == "Social Studies":
-        return explain_social(level, question)
-    if subject == "Computer":
-        return explain_computer(level, question)
-    return explain_languages(level, question)
+    for level in range(1, 11)
+    for subject in Subject.__args__
+}
+
+# Exact-match memo of finished bodies
+_cached_assist_payload = lru_cache(maxsize=4096)(build_assist_payload)
+
+# Memoized bodies are compressed once, the first time a gzip-capable client
+# asks for them. Keyed by the cached bytes object itself, so lookups hit the
+# identity fast path.
+@lru_cache(maxsize=4096)
+def _gzipped_payload(payload: bytes) -> bytes:
+    return gzip.compress(payload, compresslevel=9, mtime=0)
+
+_GZIP_HEADERS = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+_VARY_HEADERS = {"Vary": "Accept-Encoding"}
 
 # ----- Routes -----
+# Constant payloads are serialized once at import and returned as-is
+_HELLO_ROOT = Response(content=orjson.dumps({"message": "Hello from FastAPI Backend!"}), media_type="application/json")
+_HELLO_API = Response(content=orjson.dumps({"message": "Hello from the backend API!"}), media_type="application/json")
+
 @app.get("/")
-def read_root():
-    return {"message": "Hello from FastAPI Backend!"}
+async def read_root():
+    return _HELLO_ROOT
 
 @app.get("/api/hello")
-def hello():
-    return {"message": "Hello from the backend API!"}
+async def hello():
+    return _HELLO_API
+
+@app.post(
+    "/api/assist",
+    responses={200: {"model": AssistResponse}, 422: {"model": HTTPValidationError, "description": "Validation Error"}},
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": AssistRequest.model_json_schema()}},
+    }},
+)
+async def assist(request: Request):
+    body = await decode_assist_body(request)
+    errors: List[Dict[str, Any]] = []
+    level = parse_class(body.student_class, errors)
+    if errors:
+        raise RequestValidationError(errors)
+    subject, question, needs = body.subject, body.question, body.needs
+
+    # Normalize once; topic echoes the question, q_lower feeds the safety check
+    topic = question.strip()
+    q_lower = topic.lower()
 
-@app.post("/api/assist", response_model=AssistResponse)
-def assist(req: AssistRequest):
     # Safety filtering
-    if is_harmful(req.question):
-        return AssistResponse(
-            level=req.student_class,
-            subject=req.subject,
-            topic="Safety Guard",
-            sections=[Section(title="Notice", content=[
-                "I can't help with harmful or inappropriate content.",
-                "Please ask about your school subjects like Math, Science, English, Social Studies, Languages, or Computer."
-            ])],
-            safety_note="Content filtered for safety."
-        )
-
-    # Generate structured content
-    content = generate_content(req.student_class, req.subject, req.question)
-
-    # Pick sections according to req.needs or include all
-    order = [
-        "explanation", "steps", "examples", "practice", "summary", "tips", "fun_facts", "related",
-        "visuals", "revision", "quiz"
-    ]
-    include = set(req.needs) if req.needs else set(order)
-
-    sections: List[Section] = []
-
-    # A brief age-adjusted explanation headline
-    tone = level_tone(req.student_class)
-    intro = [
-        f"Let's learn about: {req.question.strip()}.",
-        "I'll keep it " + tone["voice"] + ".",
-        "You'll get steps, examples, practice, visuals, a short quiz, and revision notes."
-    ]
-    if "explanation" in include:
-        sections.append(Section(title="Explanation", content=intro))
-
-    # Add the rest from generated content
-    mapping = {
-        "steps": "Step-by-step",
-        "examples": "Examples",
-        "practice": "Practice Questions",
-        "summary": "Quick Summary",
-        "tips": "Helpful Tips",
-        "fun_facts": "Fun Facts",
-        "related": "Related Topics",
-        "visuals": "Visual Description",
-        "revision": "Revision Notes",
-        "quiz": "Interactive Quiz",
-    }
-    for key, title in mapping.items():
-        if key in include and key in content:
-            sections.append(Section(title=title, content=content[key]))
-
-    follow_up = "If this isn't quite your topic, tell me your class (1-10) and the exact chapter or exercise number."
-
-    return AssistResponse(
-        level=req.student_class,
-        subject=req.subject,
-        topic=req.question.strip(),
-        sections=sections,
-        follow_up=follow_up,
-    )
+    if is_harmful_lower(q_lower):
+        return Response(content=_SAFETY_BODIES[level, subject], media_type="application/json")
+
+    needs_key = needs_mask(needs)
+    if len(topic) > _CACHEABLE_TOPIC_LEN:
+        # Left to GZipMiddleware, which sets Vary itself when it compresses
+        payload = build_assist_payload(level, subject, topic, needs_key)
+        return Response(content=payload, media_type="application/json")
+
+    payload = _cached_assist_payload(level, subject, topic, needs_key)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(content=_gzipped_payload(payload), media_type="application/json", headers=_GZIP_HEADERS)
+    return Response(content=payload, media_type="application/json", headers=_VARY_HEADERS)
+
+# The database module is optional (see enable-database), so it is imported
+# once here rather than per request. It loads .env, hence the env reads after.
+_db = None
+_DB_IMPORT_ERROR: Optional[str] = None
+try:
+    from database import db as _db
+except ImportError:
+    _DB_IMPORT_ERROR = "❌ Database module not found (run enable-database first)"
+except Exception as e:
+    _DB_IMPORT_ERROR = f"❌ Error: {str(e)[:50]}"
+_DB_URL_SET = bool(os.getenv("DATABASE_URL"))
+_DB_NAME_SET = bool(os.getenv("DATABASE_NAME"))
+
+# /test is a health check, so its result is reused for a short while instead
+# of hitting MongoDB on every probe
+_TEST_TTL = 30.0
+_TEST_TIMEOUT = 0.5
+# Holds bytes, not a Response: GZipMiddleware rewrites the headers of the
+# Response it compresses, so a shared instance would leak them across requests
+_TEST_CACHE: Dict[str, Any] = {"body": None, "exp": 0.0}
 
 @app.get("/test")
-def test_database():
+async def test_database():
     """Test endpoint to check if database is available and accessible"""
+    if _TEST_CACHE["body"] is not None and time.monotonic() < _TEST_CACHE["exp"]:
+        return Response(content=_TEST_CACHE["body"], media_type="application/json")
+
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -462,11 +775,11 @@ def test_database():
         "collections": []
     }
     
+    db = _db
     try:
-        # Try to import database module
-        from database import db
-        
-        if db is not None:
+        if _DB_IMPORT_ERROR is not None:
+            response["database"] = _DB_IMPORT_ERROR
+        elif db is not None:
             response["database"] = "✅ Available"
             response["database_url"] = "✅ Configured"
             response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
@@ -474,28 +787,44 @@ def test_database():
             
             # Try to list collections to verify connectivity
             try:
-                collections = db.list_collection_names()
+                collections = await asyncio.wait_for(
+                    asyncio.to_thread(db.list_collection_names), timeout=_TEST_TIMEOUT
+                )
                 response["collections"] = collections[:10]  # Show first 10 collections
                 response["database"] = "✅ Connected & Working"
+            except asyncio.TimeoutError:
+                response["database"] = f"⚠️  Connected but Error: no reply within {_TEST_TIMEOUT}s"
             except Exception as e:
                 response["database"] = f"⚠️  Connected but Error: {str(e)[:50]}"
         else:
             response["database"] = "⚠️  Available but not initialized"
             
-    except ImportError:
-        response["database"] = "❌ Database module not found (run enable-database first)"
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
     
     # Check environment variables
-    import os
-    response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
+    response["database_url"] = "✅ Set" if _DB_URL_SET else "❌ Not Set"
+    response["database_name"] = "✅ Set" if _DB_NAME_SET else "❌ Not Set"
     
-    return response
+    body = orjson.dumps(response)
+    _TEST_CACHE["body"] = body
+    _TEST_CACHE["exp"] = time.monotonic() + _TEST_TTL
+    return Response(content=body, media_type="application/json")
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        # "auto" is uvloop wherever it is installed (everywhere but Windows)
+        loop="auto",
+        http="httptools",
+        # One prefork worker per core unless overridden; each keeps its own caches
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        # Shed load with 503s past this many in-flight connections per worker
+        limit_concurrency=1000,
+        timeout_keep_alive=30,
+    )